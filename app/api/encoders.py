@@ -0,0 +1,89 @@
+"""
+Wire formats used to encode telemetry packets for WebSocket clients
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Union
+import orjson
+import ormsgpack
+from app.models.telemetry_data import TelemetryData
+
+Frame = Union[bytes, str]
+
+# Strict orjson encoding: no Python default= callback, datetimes (if any) are
+# encoded natively in C as UTC with a "Z" suffix
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+# Columnar layout: field names are sent once, then one pipe-delimited row per packet
+COLUMNAR_FIELDS = ("imei", "timestamp", *TelemetryData.model_fields)
+COLUMNAR_HEADER = "|".join(COLUMNAR_FIELDS)
+
+
+@dataclass(frozen=True)
+class WireFormat:
+    """How packets are encoded, merged into one frame, and introduced to a client"""
+
+    encode: Callable[[dict], Frame]
+    merge: Callable[[List[Frame]], Frame]
+    header: Optional[Frame] = None
+
+
+def encode_json(packet: dict) -> bytes:
+    """Encode a packet as UTF-8 JSON bytes"""
+    return orjson.dumps(packet, option=ORJSON_OPTIONS)
+
+
+def merge_json(batch: List[bytes]) -> bytes:
+    """Merge several encoded packets into a single JSON array frame"""
+    if len(batch) == 1:
+        return batch[0]
+    return b"[" + b",".join(batch) + b"]"
+
+
+def encode_msgpack(packet: dict) -> bytes:
+    """Encode a packet as MessagePack bytes"""
+    return ormsgpack.packb(packet)
+
+
+def merge_msgpack(batch: List[bytes]) -> bytes:
+    """Merge several encoded packets into a single MessagePack array frame"""
+    count = len(batch)
+    if count == 1:
+        return batch[0]
+    # Array header (fixarray / array16 / array32) followed by the already-packed items
+    if count < 16:
+        header = bytes((0x90 | count,))
+    elif count < 0x10000:
+        header = b"\xdc" + count.to_bytes(2, "big")
+    else:
+        header = b"\xdd" + count.to_bytes(4, "big")
+    return header + b"".join(batch)
+
+
+def _columnar_value(value) -> str:
+    """Render a single value for a columnar row (None -> empty, lists -> CSV)"""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ",".join(value)
+    return str(value)
+
+
+def encode_columnar(packet: dict) -> str:
+    """Encode a packet as one pipe-delimited row in COLUMNAR_FIELDS order"""
+    data = packet["data"]
+    values = [packet["imei"], packet["timestamp"]]
+    values.extend(_columnar_value(data[field]) for field in COLUMNAR_FIELDS[2:])
+    return "|".join(values)
+
+
+def merge_columnar(batch: List[str]) -> str:
+    """Merge several rows (and the header, if pending) into one newline-separated frame"""
+    return "\n".join(batch)
+
+
+WIRE_FORMATS: Dict[str, WireFormat] = {
+    "json": WireFormat(encode=encode_json, merge=merge_json),
+    "columnar": WireFormat(encode=encode_columnar, merge=merge_columnar, header=COLUMNAR_HEADER),
+    "msgpack": WireFormat(encode=encode_msgpack, merge=merge_msgpack),
+}
+DEFAULT_FORMAT = "json"
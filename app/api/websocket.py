@@ -2,42 +2,96 @@
 WebSocket endpoint for real-time telemetry data streaming
 """
 import asyncio
-import json
 import logging
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Set
 from fastapi import WebSocket, WebSocketDisconnect
-from app.simulator.generator import TelemetryGenerator
+from app.api.encoders import DEFAULT_FORMAT, WIRE_FORMATS, Frame, WireFormat
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Per-client send limits: a slow client is dropped instead of stalling the broadcast.
+# The backlog is counted in ticks (one queue item per tick), so it doesn't depend on FLEET_SIZE
+SEND_TIMEOUT_SECONDS = 2.0
+MAX_QUEUED_TICKS = 12
+
+# Close code sent to dropped clients: 1013 = Try Again Later
+DROPPED_CLOSE_CODE = 1013
+
+# Backlogged packets are merged into one frame of at most this many packets
+MAX_BATCH_SIZE = 500
+
 
 class ConnectionManager:
     """Manages WebSocket connections and broadcasts telemetry data"""
     
     def __init__(self):
-        """Initialize with empty connections list"""
-        self.active_connections: List[WebSocket] = []
-        self.generator = TelemetryGenerator()
+        """Initialize with empty connections set"""
+        self.active_connections: Set[WebSocket] = set()
+        # Created on the first broadcast so importing the app (and /health, /docs) stays light
+        self.generator = None
         self.is_running = False
         self.broadcast_task = None
+        self._queues: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
+        self._formats: Dict[WebSocket, str] = {}
+        # Close tasks of dropped clients, referenced until they finish
+        self._closing: Set[asyncio.Task] = set()
+        
+        # Last tick's packets and their encodings per wire format, replayed to late joiners
+        self._latest_packets: List[dict] = []
+        self._latest_payloads: Dict[str, List[Frame]] = {}
+
+    @staticmethod
+    def _create_generator():
+        """Create a fleet generator when FLEET_SIZE is set, otherwise a single-vehicle one"""
+        # Lazy import: numpy and the generators are only loaded once a client connects
+        from app.simulator import FleetGenerator, TelemetryGenerator
+        
+        if settings.FLEET_SIZE > 0:
+            return FleetGenerator(settings.FLEET_SIZE)
+        return TelemetryGenerator()
     
-    async def connect(self, websocket: WebSocket):
-        """Accept new WebSocket connection"""
+    async def connect(self, websocket: WebSocket, wire_format: str = DEFAULT_FORMAT):
+        """Accept new WebSocket connection using the given wire format"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"Nueva conexión WebSocket establecida. Total: {len(self.active_connections)}")
+        self.active_connections.add(websocket)
+        self._formats[websocket] = wire_format
+        
+        # Each client drains its own queue, so a slow client never delays the others.
+        # Every queue item is the list of frames of one tick
+        queue = asyncio.Queue(maxsize=MAX_QUEUED_TICKS)
+        fmt = WIRE_FORMATS[wire_format]
+        if fmt.header is not None:
+            # Schema goes out exactly once, ahead of the first row
+            queue.put_nowait([fmt.header])
+        self._queues[websocket] = queue
+        self._senders[websocket] = asyncio.create_task(self._send_loop(websocket, queue, fmt))
+        logger.info(
+            f"Nueva conexión WebSocket establecida ({wire_format}). Total: {len(self.active_connections)}"
+        )
         
-        # Start broadcasting if not already running
-        if not self.is_running:
-            await self._start_broadcasting()
+        # Send the latest tick right away instead of waiting up to 5 seconds
+        if self._latest_packets:
+            self._enqueue(websocket, self._latest_frames(wire_format))
+        
+        # Start broadcasting in the background so connect() returns immediately
+        if self.broadcast_task is None or self.broadcast_task.done():
+            self.broadcast_task = asyncio.create_task(self._start_broadcasting())
     
     def disconnect(self, websocket: WebSocket):
         """Remove WebSocket connection"""
         if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+            self.active_connections.discard(websocket)
             logger.info(f"Conexión WebSocket cerrada. Total: {len(self.active_connections)}")
         
+        self._queues.pop(websocket, None)
+        self._formats.pop(websocket, None)
+        sender = self._senders.pop(websocket, None)
+        if sender and sender is not asyncio.current_task():
+            sender.cancel()
+        
         # Stop broadcasting if no connections
         if len(self.active_connections) == 0 and self.is_running:
             self._stop_broadcasting()
@@ -51,20 +105,24 @@ class ConnectionManager:
         logger.info("Iniciando transmisión de datos de telemetría cada 5 segundos...")
         
         try:
+            if self.generator is None:
+                self.generator = self._create_generator()
+            
             while self.is_running and len(self.active_connections) > 0:
-                # Generate new telemetry data
-                telemetry_packet = self.generator.generate_response()
+                # Generate new telemetry data (one packet per simulated vehicle)
+                telemetry_packets = self.generator.generate_responses()
                 
                 # Log packet info
-                imei = telemetry_packet.get("imei", "UNKNOWN")
-                timestamp = telemetry_packet.get("timestamp", "UNKNOWN")
-                logger.info(f"📡 Enviando paquete - IMEI: {imei}, TS: {timestamp}")
+                first_packet = telemetry_packets[0]
+                imei = first_packet.get("imei", "UNKNOWN")
+                timestamp = first_packet.get("timestamp", "UNKNOWN")
+                if len(telemetry_packets) == 1:
+                    logger.info(f"📡 Enviando paquete - IMEI: {imei}, TS: {timestamp}")
+                else:
+                    logger.info(f"📡 Enviando {len(telemetry_packets)} paquetes de la flota - TS: {timestamp}")
                 
-                # Convert to JSON
-                message = json.dumps(telemetry_packet, default=str)
-                
-                # Broadcast to all connected clients
-                await self._broadcast(message)
+                # Queue for all connected clients
+                self._broadcast(telemetry_packets)
                 
                 # Wait 5 seconds before next transmission
                 await asyncio.sleep(5)
@@ -72,31 +130,98 @@ class ConnectionManager:
         except Exception as e:
             logger.error(f"Error en broadcasting: {str(e)}")
         finally:
-            self.is_running = False
+            # A newer broadcast task may already be running after a stop/start cycle
+            if self.broadcast_task is asyncio.current_task():
+                self.is_running = False
+                self.broadcast_task = None
             logger.info("Broadcasting detenido")
     
     def _stop_broadcasting(self):
-        """Stop the broadcasting loop"""
+        """Stop the broadcasting loop and cancel its task"""
         self.is_running = False
+        if self.broadcast_task:
+            self.broadcast_task.cancel()
+            self.broadcast_task = None
+        
+        # Don't replay stale data to the next client
+        self._latest_packets = []
+        self._latest_payloads = {}
         logger.info("Solicitud de detener broadcasting")
     
-    async def _broadcast(self, message: str):
-        """Send message to all connected clients"""
-        if not self.active_connections:
+    def _latest_frames(self, wire_format: str) -> List[Frame]:
+        """Get the latest tick's packets encoded in a wire format, encoding them at most once"""
+        frames = self._latest_payloads.get(wire_format)
+        if frames is None:
+            encode = WIRE_FORMATS[wire_format].encode
+            frames = [encode(packet) for packet in self._latest_packets]
+            self._latest_payloads[wire_format] = frames
+        return frames
+    
+    def _enqueue(self, websocket: WebSocket, frames: List[Frame]):
+        """Queue one tick's frames for one client, dropping it if its queue is full"""
+        queue = self._queues.get(websocket)
+        if queue is None:
             return
+        try:
+            queue.put_nowait(frames)
+        except asyncio.QueueFull:
+            logger.warning("Cliente demasiado lento, cola de envío llena. Desconectando")
+            self._drop(websocket)
+    
+    def _drop(self, websocket: WebSocket):
+        """
+        Disconnect a client and close its socket, so its endpoint stops
+        waiting on receive_text() and the client gets a close frame
+        """
+        self.disconnect(websocket)
+        task = asyncio.create_task(self._close(websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        """Close a dropped client's socket, ignoring sockets that are already closed"""
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=DROPPED_CLOSE_CODE), timeout=SEND_TIMEOUT_SECONDS
+            )
+        except Exception as e:
+            logger.debug(f"No se pudo cerrar el WebSocket: {str(e) or type(e).__name__}")
+    
+    def _broadcast(self, packets: List[dict]):
+        """
+        Encode the tick's packets once per wire format in use and queue them for every client.
+        All clients of a format share the same encoded payloads.
+        """
+        # Replaced every tick before any await, so packet dicts reused by the
+        # generator on the next tick are never read stale
+        self._latest_packets = packets
+        self._latest_payloads = {}
         
-        # Broadcast to all clients
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.warning(f"Error enviando mensaje a cliente: {str(e)}")
-                disconnected.append(connection)
-        
-        # Remove disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
+        for websocket, wire_format in list(self._formats.items()):
+            self._enqueue(websocket, self._latest_frames(wire_format))
+    
+    async def _send_loop(self, websocket: WebSocket, queue: asyncio.Queue, fmt: WireFormat):
+        """
+        Send queued payloads to a single client.
+        Ticks that piled up while the previous frame was being sent are
+        drained together, and packets are sent as frames of up to
+        MAX_BATCH_SIZE packets instead of one frame each.
+        """
+        try:
+            while True:
+                # Copy: frame lists are shared by every client of the same format
+                pending = list(await queue.get())
+                while not queue.empty():
+                    pending.extend(queue.get_nowait())
+                
+                for start in range(0, len(pending), MAX_BATCH_SIZE):
+                    frame: Frame = fmt.merge(pending[start:start + MAX_BATCH_SIZE])
+                    send = websocket.send_text if isinstance(frame, str) else websocket.send_bytes
+                    await asyncio.wait_for(send(frame), timeout=SEND_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning(f"Error enviando mensaje a cliente: {str(e) or type(e).__name__}")
+            self._drop(websocket)
 
 
 # Global connection manager instance
@@ -109,9 +234,22 @@ async def websocket_telemetry_endpoint(websocket: WebSocket):
     
     Usage:
         Connect to: ws://localhost:8000/ws/telemetria
-        Receive JSON data every 5 seconds
+        Receive JSON data (UTF-8 binary frames) every 5 seconds.
+        A frame holds one packet, or a JSON array of packets when several were queued.
+    
+    Query parameters:
+        format: "json" (default), "columnar" or "msgpack". Columnar clients
+            receive a pipe-delimited header line once, then one text row per
+            packet. MessagePack clients receive binary frames holding one
+            packet or an array of packets.
     """
-    await manager.connect(websocket)
+    wire_format = websocket.query_params.get("format", DEFAULT_FORMAT)
+    if wire_format not in WIRE_FORMATS:
+        logger.warning(f"Formato no soportado solicitado: '{wire_format}'")
+        await websocket.close(code=1008)
+        return
+    
+    await manager.connect(websocket, wire_format)
     
     try:
         # Keep connection alive and handle any incoming messages
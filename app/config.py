@@ -2,12 +2,17 @@
 Configuration settings for Telemetry Simulator
 """
 import os
+import re
 import logging
+from functools import cached_property
 from typing import List, Optional
 from pydantic import field_validator, ConfigDict
 
 logger = logging.getLogger(__name__)
 
+# IMEI: exactly 15 ASCII digits (length and digit checks in one match)
+_IMEI_RE = re.compile(r"\A[0-9]{15}\Z")
+
 try:
     from pydantic_settings import BaseSettings
 except ImportError:
@@ -23,6 +28,12 @@ class Settings(BaseSettings):
     DEVICE_IMEI_LIST: Optional[str] = None
     ALLOW_GENERATE_IMEI: bool = False
     
+    # Fleet simulation: number of vehicles generated per tick (0 = single vehicle)
+    FLEET_SIZE: int = 0
+    
+    # Debug mode: validates every generated packet against the Pydantic models
+    DEBUG: bool = False
+    
     model_config = ConfigDict(
         env_file=".env",
         case_sensitive=True
@@ -35,15 +46,16 @@ class Settings(BaseSettings):
         if v is None:
             return None
         v = str(v).strip()
-        if not v.isdigit() or len(v) != 15:
+        if not _IMEI_RE.match(v):
             raise ValueError(f"DEVICE_IMEI debe ser exactamente 15 dígitos. Recibido: '{v}'")
         return v
     
-    @property
+    @cached_property
     def imei_list(self) -> List[str]:
         """
         Get list of valid IMEIs from environment variables.
         Returns empty list if none configured.
+        Parsed once: settings are loaded at startup and don't change afterwards.
         """
         imeis = []
         
@@ -57,13 +69,40 @@ class Settings(BaseSettings):
             raw_list = self.DEVICE_IMEI_LIST.split(",")
             for imei in raw_list:
                 imei = imei.strip()
-                if imei and imei.isdigit() and len(imei) == 15:
+                if _IMEI_RE.match(imei):
                     imeis.append(imei)
                 elif imei:  # Non-empty but invalid
                     logger.warning(f"IMEI inválido descartado: '{imei}' (debe ser 15 dígitos)")
         
         return imeis
     
+    @cached_property
+    def selected_imei(self) -> str:
+        """
+        IMEI chosen by validate_imei_config, computed once and shared by
+        startup and the generators so the selection (and its logs) happen once.
+        """
+        return self.validate_imei_config()
+    
+    def validate_fleet_imeis(self, n_vehicles: int) -> int:
+        """
+        Check that a fleet of n_vehicles can get one IMEI per vehicle.
+        
+        Returns:
+            int: Number of IMEIs that must be generated to complete the fleet
+            
+        Raises:
+            RuntimeError: If there are not enough IMEIs and generation is not allowed
+        """
+        available = len(self.imei_list)
+        missing = max(n_vehicles - available, 0)
+        if missing and not self.ALLOW_GENERATE_IMEI:
+            raise RuntimeError(
+                f"FLEET_SIZE={n_vehicles} requiere {n_vehicles} IMEIs configurados "
+                f"({available} disponibles) o ALLOW_GENERATE_IMEI=true"
+            )
+        return missing
+    
     def validate_imei_config(self) -> str:
         """
         Validate IMEI configuration and return first IMEI or generate one.
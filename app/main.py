@@ -30,9 +30,17 @@ async def lifespan(app: FastAPI):
         imeis = settings.imei_list
         logger.info(f"IMEI configurado: {len(imeis)} dispositivo(s)")
         
-        # Try to get first IMEI to validate
-        initial_imei = settings.validate_imei_config()
+        # Validate once; the selected IMEI is reused by the generators
+        initial_imei = settings.selected_imei
         logger.info(f"✅ IMEI inicial: {initial_imei}")
+        
+        # The fleet generator (and numpy) is created on the first broadcast,
+        # so check here that every vehicle can get an IMEI
+        if settings.FLEET_SIZE > 0:
+            missing = settings.validate_fleet_imeis(settings.FLEET_SIZE)
+            logger.info(
+                f"✅ Flota de {settings.FLEET_SIZE} vehículo(s), {missing} IMEI(s) a generar"
+            )
     except Exception as e:
         logger.error(f"❌ Error en configuración de IMEI: {str(e)}")
         raise
@@ -100,7 +108,7 @@ async def websocket_endpoint(websocket: WebSocket):
     WebSocket endpoint for telemetry data streaming
     
     Connects to ws://localhost:8000/ws/telemetria
-    Receives JSON data every 5 seconds with simulated telemetry values
+    Receives JSON data (UTF-8 binary frames) every 5 seconds with simulated telemetry values
     
     Returns:
         - JSON with timestamp and telemetry data including:
@@ -127,5 +135,12 @@ async def shutdown_event():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    
+    # uvloop (libuv) speeds up WebSocket I/O; it is not available on Windows
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True, loop=loop)
 
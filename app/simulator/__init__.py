@@ -2,6 +2,7 @@
 Simulator package for generating realistic telemetry data
 """
 from .generator import TelemetryGenerator
+from .fleet import FleetGenerator
 
-__all__ = ["TelemetryGenerator"]
+__all__ = ["TelemetryGenerator", "FleetGenerator"]
 
@@ -0,0 +1,218 @@
+"""
+Vectorized telemetry generator for fleets of simulated vehicles
+"""
+import logging
+from typing import List
+import numpy as np
+from app.models.telemetry_data import TelemetryData
+from app.config import settings
+from app.simulator.generator import (
+    TelemetryGenerator,
+    VehicleState,
+    format_gps_location,
+    generate_random_imei,
+    utc_timestamp,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows of uniform draws consumed by one call to FleetGenerator._build_data_dicts
+_DRAWS_PER_TICK = 19
+
+# Data fields in TelemetryData declaration order
+_DATA_FIELDS = tuple(TelemetryData.model_fields)
+
+
+def _randint(u: np.ndarray, low, high) -> np.ndarray:
+    """Map uniform draws in [0, 1) to integers in [low, high] (inclusive)"""
+    return low + (u * (high - low + 1)).astype(np.int64)
+
+
+def _uniform(u: np.ndarray, low: float, high: float) -> np.ndarray:
+    """Map uniform draws in [0, 1) to floats in [low, high)"""
+    return low + u * (high - low)
+
+
+class FleetGenerator:
+    """
+    Generates telemetry for N vehicles per tick with the same coherent rules
+    as TelemetryGenerator. State is stored as one numpy array per field
+    (structure of arrays) and every tick updates the whole fleet at once.
+    """
+
+    def __init__(self, n_vehicles: int):
+        """
+        Initialize the fleet with random initial state
+
+        Args:
+            n_vehicles: Number of simulated vehicles (one IMEI each)
+        """
+        if n_vehicles < 1:
+            raise ValueError(f"n_vehicles debe ser mayor que 0. Recibido: {n_vehicles}")
+
+        self.n_vehicles = n_vehicles
+        self.imeis = self._assign_imeis(n_vehicles)
+        self._rng = np.random.default_rng()
+
+        # Randomize initial state for variety, remaining fields start from VehicleState defaults
+        defaults = VehicleState()
+        self.ignition = self._rng.integers(0, 2, n_vehicles, dtype=np.int8)
+        self.in_motion = self._rng.integers(0, 2, n_vehicles, dtype=np.int8)
+        self.speed = (self._rng.integers(0, 81, n_vehicles) * self.ignition).astype(np.int32)
+        self.lat = np.full(n_vehicles, defaults.lat)
+        self.lon = np.full(n_vehicles, defaults.lon)
+        self.total_odo = np.full(n_vehicles, defaults.total_odo, dtype=np.int64)
+        self.trip_odo = np.full(n_vehicles, defaults.trip_odo, dtype=np.int64)
+        self.fuel_level = np.full(n_vehicles, defaults.fuel_level, dtype=np.float64)
+        self.oil_level = np.full(n_vehicles, defaults.oil_level, dtype=np.int32)
+        self.fuel_used_total = np.full(n_vehicles, defaults.fuel_used_total)
+
+        logger.info(f"Flota inicializada con {n_vehicles} vehículo(s)")
+
+    @staticmethod
+    def _assign_imeis(n_vehicles: int) -> List[str]:
+        """
+        Assign one IMEI per vehicle: configured IMEIs first, then generated ones
+
+        Raises:
+            RuntimeError: If there are not enough IMEIs and generation is not allowed
+        """
+        missing = settings.validate_fleet_imeis(n_vehicles)
+        imeis = settings.imei_list[:n_vehicles]
+        if missing > 0:
+            logger.warning(f"⚠️  Generando {missing} IMEI(s) aleatorio(s) para completar la flota")
+            imeis.extend(generate_random_imei() for _ in range(missing))
+        return imeis
+
+    def _generate_obd_faults(self, u_chance: np.ndarray, u_count: np.ndarray) -> List[List[str]]:
+        """
+        Generate random OBD fault codes per vehicle (occasional, not always)
+        """
+        pool = TelemetryGenerator._obd_faults_pool
+        faults = [[] for _ in range(self.n_vehicles)]
+        faulty = np.flatnonzero(u_chance < 0.15)  # 15% chance of having faults
+        for i, num_faults in zip(faulty.tolist(), _randint(u_count[faulty], 1, 3).tolist()):
+            faults[i] = [pool[j] for j in self._rng.choice(len(pool), num_faults, replace=False).tolist()]
+        return faults
+
+    def _build_data_dicts(self) -> List[dict]:
+        """
+        Advance every vehicle one tick and return one data dict per vehicle
+        """
+        # Draw every random value for this tick in a single call
+        (u_ignition, u_motion, u_speed, u_rpm, u_load, u_temp, u_consumption,
+         u_trip, u_total, u_fuel, u_lat, u_lon, u_obd_chance, u_obd_count,
+         u_curve, u_g_value, u_gsm_chance, u_gsm, u_oil) = self._rng.random((_DRAWS_PER_TICK, self.n_vehicles))
+
+        # Update ignition (5% chance to toggle) and movement status
+        self.ignition ^= u_ignition < 0.05
+        ignition_on = self.ignition == 1
+        self.in_motion ^= ignition_on & (u_motion < 0.3)
+        movement = self.in_motion * ignition_on
+        moving = movement == 1
+
+        # Update speed based on movement and ignition
+        prev_speed = self.speed.copy()
+        self.speed[:] = np.where(
+            moving,
+            np.clip(prev_speed + _randint(u_speed, -3, 8), 0, 350),
+            np.maximum(prev_speed - _randint(u_speed, 0, 5), 0)
+        ) * ignition_on
+        speed = self.speed
+
+        # RPM range by speed band: idle, city, highway, high speed
+        bands = [speed == 0, speed < 40, speed < 80]
+        rpm_low = np.select(bands, [700, 1200, 2000], 3500)
+        rpm_high = np.select(bands, [900, 2500, 3500], 6000)
+        rpm = _randint(u_rpm, rpm_low, rpm_high) * ignition_on
+
+        # Engine load and temperature
+        engine_load = _randint(u_load, 30, 70)
+        base_temp = np.where(engine_load < 30, 75, 95)
+        engine_temp = np.where(
+            ignition_on,
+            _randint(u_temp, base_temp - 5, base_temp + 5),
+            _randint(u_temp, -60, 40)
+        )
+
+        # Fuel consumption in L/h
+        instant_consumption = np.round(np.where(
+            moving,
+            8.0 + speed / 20 + engine_load / 10 + _uniform(u_consumption, -2, 3),
+            _uniform(u_consumption, 0.2, 0.8)
+        ), 1)
+
+        # Update odometers and fuel level for moving vehicles
+        self.trip_odo += _randint(u_trip, 200, 500) * movement
+        self.total_odo += _randint(u_total, 200, 500) * movement
+        self.fuel_level[:] = np.where(
+            moving,
+            np.maximum(self.fuel_level - _uniform(u_fuel, 0.01, 0.05), 0),
+            self.fuel_level
+        )
+        self.fuel_used_total += np.where(moving, instant_consumption / 7200, 0)
+
+        # Simulate slight GPS movement
+        self.lat += _uniform(u_lat, -0.001, 0.001)
+        self.lon += _uniform(u_lon, -0.001, 0.001)
+
+        # Event type: 1=Acceleration, 2=Braking, 3=Curve (0 = no event)
+        speed_diff = speed - prev_speed
+        accelerating = speed_diff > 5
+        braking = speed_diff < -5
+        event_type = np.select([accelerating, braking, u_curve < 0.3], [1, 2, 3], 0)
+        event_g_value = np.select(
+            [accelerating, braking],
+            [np.minimum(255, 15 + speed_diff * 2), np.minimum(255, 20 + np.abs(speed_diff) * 2)],
+            _randint(u_g_value, 10, 40)
+        )
+
+        # GSM signal (usually good, occasionally weak) and oil level variations
+        gsm_signal = np.where(u_gsm_chance < 0.9, _randint(u_gsm, 1, 5), _randint(u_gsm, 3, 5))
+        oil_level = np.clip(self.oil_level + _randint(u_oil, -2, 1), 70, 100)
+
+        # Convert columns to Python values in TelemetryData field order
+        columns = (
+            self.ignition.tolist(),
+            movement.tolist(),
+            speed.tolist(),
+            list(map(format_gps_location, self.lat.tolist(), self.lon.tolist())),
+            gsm_signal.tolist(),
+            rpm.tolist(),
+            engine_temp.tolist(),
+            engine_load.tolist(),
+            oil_level.tolist(),
+            self.fuel_level.astype(np.int64).tolist(),
+            np.round(self.fuel_used_total, 2).tolist(),
+            instant_consumption.tolist(),
+            self._generate_obd_faults(u_obd_chance, u_obd_count),
+            self.total_odo.tolist(),
+            self.trip_odo.tolist(),
+            [event or None for event in event_type.tolist()],
+            event_g_value.tolist(),
+        )
+        data_dicts = [dict(zip(_DATA_FIELDS, row)) for row in zip(*columns)]
+
+        if settings.DEBUG:
+            # Validate against the Pydantic schema only while debugging
+            for data in data_dicts:
+                TelemetryData(**data)
+
+        return data_dicts
+
+    def generate_responses(self) -> List[dict]:
+        """
+        Generate one telemetry packet per vehicle for the current tick
+
+        Returns:
+            list: Telemetry packets sharing the tick timestamp
+        """
+        timestamp = utc_timestamp()
+        packets = [
+            {"imei": imei, "timestamp": timestamp, "data": data}
+            for imei, data in zip(self.imeis, self._build_data_dicts())
+        ]
+
+        logger.debug(f"Paquetes generados - Vehículos: {len(packets)}, TS: {timestamp}")
+
+        return packets
@@ -3,14 +3,24 @@ Telemetry data generator with coherent value relationships
 """
 import random
 import math
+import time
+from itertools import cycle
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import List, Tuple
+import numpy as np
 from app.models.telemetry_data import TelemetryData
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Uniform draws consumed by one call to TelemetryGenerator._build_data_dict
+_DRAWS_PER_TICK = 19
+
+# ISO6709 "+lat-lon/" formatter, bound once; explicit signs keep southern latitudes valid
+format_gps_location = "{:+.5f}{:+.5f}/".format
+
 
 def generate_random_imei() -> str:
     """
@@ -23,38 +33,91 @@ def generate_random_imei() -> str:
     return "".join(str(random.randint(0, 9)) for _ in range(15))
 
 
+class _UtcTimestampFormatter:
+    """
+    Formats the current time as ISO 8601 UTC with microseconds.
+    The "YYYY-MM-DDTHH:MM:" prefix is cached and only rebuilt when the minute changes.
+    """
+    
+    __slots__ = ("_cached_minute_epoch", "_cached_minute_prefix")
+    
+    def __init__(self):
+        self._cached_minute_epoch = -1
+        self._cached_minute_prefix = ""
+    
+    def __call__(self) -> str:
+        """
+        Get current timestamp in ISO 8601 UTC format with microseconds
+        
+        Returns:
+            str: ISO 8601 timestamp (e.g., "2025-10-27T13:30:00.123456Z")
+        """
+        sec, subsec_ns = divmod(time.time_ns(), 1_000_000_000)
+        minute_epoch, second = divmod(sec, 60)
+        if minute_epoch != self._cached_minute_epoch:
+            minute_start = datetime.fromtimestamp(minute_epoch * 60, timezone.utc)
+            self._cached_minute_prefix = minute_start.strftime("%Y-%m-%dT%H:%M:")
+            self._cached_minute_epoch = minute_epoch
+        return f"{self._cached_minute_prefix}{second:02d}.{subsec_ns // 1000:06d}Z"
+
+
+utc_timestamp = _UtcTimestampFormatter()
+
+
+def _randint(u: float, low: int, high: int) -> int:
+    """Map a uniform draw in [0, 1) to an integer in [low, high] (inclusive)"""
+    return low + int(u * (high - low + 1))
+
+
+def _uniform(u: float, low: float, high: float) -> float:
+    """Map a uniform draw in [0, 1) to a float in [low, high)"""
+    return low + u * (high - low)
+
+
+@dataclass(slots=True)
+class VehicleState:
+    """Mutable vehicle state that persists across generations for continuity"""
+    
+    ignition: int = 0
+    in_motion: int = 0
+    speed: int = 0
+    lat: float = 4.60971  # Bogotá
+    lon: float = -74.08175
+    total_odo: int = 2456789
+    trip_odo: int = 34567
+    fuel_level: float = 68
+    oil_level: int = 80
+    fuel_used_total: float = 150.0
+
+
 class TelemetryGenerator:
     """
     Generates realistic telemetry data with coherent relationships between values.
     For example: if ignition is ON and vehicle is moving, speed should increase.
     """
     
-    # Base values that persist across generations for continuity
-    _base_state = {
-        'lat': 4.60971,  # Bogotá
-        'lon': -74.08175,
-        'total_odo': 2456789,
-        'trip_odo': 34567,
-        'fuel_level': 68,
-        'oil_level': 80,
-    }
-    
-    # Common OBD fault codes for realistic simulation
-    _obd_faults_pool = [
+    # Common OBD fault codes for realistic simulation (unique, so each is equally likely)
+    _obd_faults_pool = (
         "P0135", "P0420", "P0300", "P0171", "P0174",
-        "P0301", "P0302", "P0303", "P0304", "P0420",
+        "P0301", "P0302", "P0303", "P0304",
         "U0100", "U0101", "B0001", "B0002"
-    ]
+    )
     
     def __init__(self):
         """Initialize the generator with random initial state"""
+        # Single RNG: every tick draws its random values in one batch
+        self._rng = np.random.default_rng()
+        
         # Randomize initial state for variety
-        self._base_state['ignition'] = random.choice([0, 1])
-        self._base_state['in_motion'] = random.choice([0, 1])
-        self._base_state['speed'] = random.randint(0, 80) if self._base_state['ignition'] else 0
+        u_ignition, u_motion, u_speed = self._rng.random(3).tolist()
+        ignition = _randint(u_ignition, 0, 1)
+        self.state = VehicleState(
+            ignition=ignition,
+            in_motion=_randint(u_motion, 0, 1),
+            speed=_randint(u_speed, 0, 80) if ignition else 0
+        )
         
         # Initialize IMEI selection
-        self._imei_index = 0
         self._imeis = settings.imei_list
         if not self._imeis and settings.ALLOW_GENERATE_IMEI:
             # Will generate on first call
@@ -62,27 +125,33 @@ class TelemetryGenerator:
         elif not self._imeis:
             raise RuntimeError("No IMEI configurado. Verifique DEVICE_IMEI o ALLOW_GENERATE_IMEI")
         
-        # Get current IMEI
-        self._selected_imei = settings.validate_imei_config()
-        logger.info(f"Generador inicializado con IMEI: {self._selected_imei}")
+        # Packet dict reused by every generate_response() call
+        self._packet_template = {"imei": "", "timestamp": "", "data": None}
+        
+        # Round-robin over configured IMEIs
+        self._imei_iter = cycle(self._imeis) if self._imeis else None
         
-    def _generate_gps_coordinate(self) -> str:
+        # Get current IMEI (validated once and cached on settings)
+        self._selected_imei = settings.selected_imei
+        
+    def _generate_gps_coordinate(self, u_lat: float, u_lon: float) -> str:
         """
         Generate GPS coordinate in ISO6709 format
         Returns format: +DD.MM.MMMm +DDD.MM.MMMm/  or +DD.MMSSS +DDD.MMSSS/
         Simplified version: +04.60971-074.08175/
         """
         # Simulate slight movement
-        lat_change = random.uniform(-0.001, 0.001)
-        lon_change = random.uniform(-0.001, 0.001)
+        lat_change = _uniform(u_lat, -0.001, 0.001)
+        lon_change = _uniform(u_lon, -0.001, 0.001)
         
-        self._base_state['lat'] += lat_change
-        self._base_state['lon'] += lon_change
+        state = self.state
+        state.lat += lat_change
+        state.lon += lon_change
         
         # Format as ISO6709: +lat-lon/
-        return f"+{self._base_state['lat']:.5f}{self._base_state['lon']:.5f}/"
+        return format_gps_location(state.lat, state.lon)
     
-    def _generate_rpm(self, ignition: int, speed: int) -> int:
+    def _generate_rpm(self, ignition: int, speed: int, u: float) -> int:
         """
         Generate RPM based on ignition status and speed
         """
@@ -91,18 +160,18 @@ class TelemetryGenerator:
         
         if speed == 0:
             # Idle RPM (700-900)
-            return random.randint(700, 900)
+            return _randint(u, 700, 900)
         elif speed < 40:
             # City driving (1200-2500)
-            return random.randint(1200, 2500)
+            return _randint(u, 1200, 2500)
         elif speed < 80:
             # Highway cruising (2000-3500)
-            return random.randint(2000, 3500)
+            return _randint(u, 2000, 3500)
         else:
             # High speed (3500-6000)
-            return random.randint(3500, 6000)
+            return _randint(u, 3500, 6000)
     
-    def _generate_engine_temp(self, ignition: int, engine_load: int) -> int:
+    def _generate_engine_temp(self, ignition: int, engine_load: int, u: float) -> int:
         """
         Generate engine temperature based on operation status
         Normal operating temp: 90-95°C
@@ -110,42 +179,41 @@ class TelemetryGenerator:
         """
         if ignition == 0:
             # Engine off, cooling down
-            return random.randint(-60, 40)
+            return _randint(u, -60, 40)
         
         # Running engine temperature based on load
         base_temp = 75 if engine_load < 30 else 95
-        return random.randint(base_temp - 5, base_temp + 5)
+        return _randint(u, base_temp - 5, base_temp + 5)
     
-    def _generate_fuel_consumption(self, speed: int, engine_load: int, movement: int) -> float:
+    def _generate_fuel_consumption(self, speed: int, engine_load: int, movement: int, u: float) -> float:
         """
         Generate realistic fuel consumption in L/h
         """
         if movement == 0:
-            return round(random.uniform(0.2, 0.8), 1)  # Idle consumption
+            return round(_uniform(u, 0.2, 0.8), 1)  # Idle consumption
         
         # Consumption increases with speed and load
         base_consumption = 8.0 + (speed / 20) + (engine_load / 10)
-        return round(base_consumption + random.uniform(-2, 3), 1)
+        return round(base_consumption + _uniform(u, -2, 3), 1)
     
-    def _generate_obd_faults(self) -> List[str]:
+    def _generate_obd_faults(self, u_chance: float, u_count: float) -> List[str]:
         """
         Generate random OBD fault codes (occasional, not always)
         """
-        faults = []
-        if random.random() < 0.15:  # 15% chance of having faults
-            num_faults = random.randint(1, 3)
-            faults = random.sample(self._obd_faults_pool, num_faults)
-        return faults
+        if u_chance >= 0.15:  # 15% chance of having faults
+            return []
+        
+        # Draw distinct indices and look the codes up in the fixed pool
+        pool = self._obd_faults_pool
+        num_faults = _randint(u_count, 1, 3)
+        return [pool[i] for i in self._rng.choice(len(pool), num_faults, replace=False).tolist()]
     
-    def _generate_event_data(self, speed: int, prev_speed: int = None) -> tuple:
+    def _generate_event_data(self, speed: int, prev_speed: int, u_curve: float, u_g_value: float) -> tuple:
         """
         Generate event type and G-value based on speed changes
         Returns: (event_type, event_g_value)
         event_type: 1=Acceleration, 2=Braking, 3=Curve
         """
-        if prev_speed is None:
-            prev_speed = speed
-            
         speed_diff = speed - prev_speed
         
         if speed_diff > 5:
@@ -156,101 +224,116 @@ class TelemetryGenerator:
             return (2, min(255, int(20 + abs(speed_diff) * 2)))
         else:
             # Normal driving or curve
-            return (3 if random.random() < 0.3 else None, random.randint(10, 40))
+            return (3 if u_curve < 0.3 else None, _randint(u_g_value, 10, 40))
     
-    def generate_telemetry_data(self) -> TelemetryData:
+    def _build_data_dict(self) -> dict:
         """
-        Generate a complete set of telemetry data with coherent relationships
+        Generate a complete set of telemetry data with coherent relationships.
+        Returns a plain dict keyed like TelemetryData; the model is only used
+        to validate the values when DEBUG is enabled.
         """
+        state = self.state
+        
+        # Draw every random value for this tick in a single call
+        (u_ignition, u_motion, u_speed, u_rpm, u_load, u_temp, u_consumption,
+         u_trip, u_total, u_fuel, u_lat, u_lon, u_obd_chance, u_obd_count,
+         u_curve, u_g_value, u_gsm_chance, u_gsm, u_oil) = self._rng.random(_DRAWS_PER_TICK).tolist()
+        
         # Update ignition (can randomly change)
-        if random.random() < 0.05:  # 5% chance to toggle
-            self._base_state['ignition'] = 1 - self._base_state['ignition']
+        if u_ignition < 0.05:  # 5% chance to toggle
+            state.ignition = 1 - state.ignition
         
-        ignition = self._base_state['ignition']
+        ignition = state.ignition
         
         # Update movement status
         if ignition == 1:
             # Vehicle can be moving or stationary
-            if random.random() < 0.3:
-                self._base_state['in_motion'] = 1 - self._base_state['in_motion']
-            movement = self._base_state['in_motion']
+            if u_motion < 0.3:
+                state.in_motion = 1 - state.in_motion
+            movement = state.in_motion
         else:
             movement = 0
         
         # Update speed based on movement and ignition
-        prev_speed = self._base_state.get('speed', 0)
+        prev_speed = state.speed
         if ignition == 0:
-            self._base_state['speed'] = 0
+            state.speed = 0
         elif movement == 0:
-            self._base_state['speed'] = max(0, self._base_state['speed'] - random.randint(0, 5))
+            state.speed = max(0, state.speed - _randint(u_speed, 0, 5))
         else:
             # Gradually increase/decrease speed
-            speed_change = random.randint(-3, 8)
-            self._base_state['speed'] = max(0, min(350, self._base_state['speed'] + speed_change))
+            speed_change = _randint(u_speed, -3, 8)
+            state.speed = max(0, min(350, state.speed + speed_change))
         
-        speed = self._base_state['speed']
+        speed = state.speed
         
         # Generate dependent values
-        rpm = self._generate_rpm(ignition, speed)
-        engine_load = random.randint(30, 70)
-        engine_temp = self._generate_engine_temp(ignition, engine_load)
+        rpm = self._generate_rpm(ignition, speed, u_rpm)
+        engine_load = _randint(u_load, 30, 70)
+        engine_temp = self._generate_engine_temp(ignition, engine_load, u_temp)
         
         # Generate fuel consumption
-        instant_consumption = self._generate_fuel_consumption(speed, engine_load, movement)
+        instant_consumption = self._generate_fuel_consumption(speed, engine_load, movement, u_consumption)
         
         # Update odometer (slight increase)
         if movement == 1:
-            trip_inc = random.randint(200, 500)
-            total_inc = random.randint(200, 500)
-            self._base_state['trip_odo'] += trip_inc
-            self._base_state['total_odo'] += total_inc
+            trip_inc = _randint(u_trip, 200, 500)
+            total_inc = _randint(u_total, 200, 500)
+            state.trip_odo += trip_inc
+            state.total_odo += total_inc
         
         # Update fuel level (gradual decrease)
         if movement == 1 and ignition == 1:
-            fuel_decrease = random.uniform(0.01, 0.05)
-            self._base_state['fuel_level'] = max(0, self._base_state['fuel_level'] - fuel_decrease)
+            fuel_decrease = _uniform(u_fuel, 0.01, 0.05)
+            state.fuel_level = max(0, state.fuel_level - fuel_decrease)
         
         # Generate GPS location
-        gps_location = self._generate_gps_coordinate()
+        gps_location = self._generate_gps_coordinate(u_lat, u_lon)
         
         # Generate OBD faults
-        obd_faults = self._generate_obd_faults()
+        obd_faults = self._generate_obd_faults(u_obd_chance, u_obd_count)
         
         # Generate event data
-        event_type, event_g_value = self._generate_event_data(speed, prev_speed)
+        event_type, event_g_value = self._generate_event_data(speed, prev_speed, u_curve, u_g_value)
         
         # Generate GSM signal (usually good, occasionally weak)
-        gsm_signal = random.randint(1, 5) if random.random() < 0.9 else random.randint(3, 5)
+        gsm_signal = _randint(u_gsm, 1, 5) if u_gsm_chance < 0.9 else _randint(u_gsm, 3, 5)
         
         # Generate oil level (slight variations)
-        oil_level = max(70, min(100, self._base_state['oil_level'] + random.randint(-2, 1)))
+        oil_level = max(70, min(100, state.oil_level + _randint(u_oil, -2, 1)))
         
         # Calculate fuel used GPS (accumulative)
         if movement == 1:
-            fuel_used_gps = self._base_state.get('fuel_used_total', 150.0) + instant_consumption / 7200  # per second approximation
-            self._base_state['fuel_used_total'] = fuel_used_gps
+            fuel_used_gps = state.fuel_used_total + instant_consumption / 7200  # per second approximation
+            state.fuel_used_total = fuel_used_gps
         else:
-            fuel_used_gps = self._base_state.get('fuel_used_total', 150.0)
-        
-        return TelemetryData(
-            ignition_status=ignition,
-            movement_status=movement,
-            speed=speed,
-            gps_location=gps_location,
-            gsm_signal=gsm_signal,
-            rpm=rpm,
-            engine_temp=engine_temp,
-            engine_load=engine_load,
-            oil_level=oil_level,
-            fuel_level=int(self._base_state['fuel_level']),
-            fuel_used_gps=round(fuel_used_gps, 2),
-            instant_consumption=instant_consumption,
-            obd_faults=obd_faults,
-            odometer_total=self._base_state['total_odo'],
-            odometer_trip=self._base_state['trip_odo'],
-            event_type=event_type,
-            event_g_value=event_g_value
-        )
+            fuel_used_gps = state.fuel_used_total
+        
+        data = {
+            "ignition_status": ignition,
+            "movement_status": movement,
+            "speed": speed,
+            "gps_location": gps_location,
+            "gsm_signal": gsm_signal,
+            "rpm": rpm,
+            "engine_temp": engine_temp,
+            "engine_load": engine_load,
+            "oil_level": oil_level,
+            "fuel_level": int(state.fuel_level),
+            "fuel_used_gps": round(fuel_used_gps, 2),
+            "instant_consumption": instant_consumption,
+            "obd_faults": obd_faults,
+            "odometer_total": state.total_odo,
+            "odometer_trip": state.trip_odo,
+            "event_type": event_type,
+            "event_g_value": event_g_value
+        }
+        
+        if settings.DEBUG:
+            # Validate against the Pydantic schema only while debugging
+            TelemetryData(**data)
+        
+        return data
     
     def _get_current_imei(self) -> str:
         """
@@ -259,17 +342,14 @@ class TelemetryGenerator:
         Returns:
             str: Current IMEI to use
         """
-        if len(self._imeis) > 1:
+        if self._imei_iter is not None:
             # Round-robin selection
-            self._imei_index = (self._imei_index + 1) % len(self._imeis)
-            return self._imeis[self._imei_index]
-        elif len(self._imeis) == 1:
-            return self._imeis[0]
-        else:
-            # Generate if allowed
-            if settings.ALLOW_GENERATE_IMEI:
-                return generate_random_imei()
-            return self._selected_imei
+            return next(self._imei_iter)
+        
+        # Generate if allowed
+        if settings.ALLOW_GENERATE_IMEI:
+            return generate_random_imei()
+        return self._selected_imei
     
     def _get_current_timestamp(self) -> str:
         """
@@ -278,11 +358,13 @@ class TelemetryGenerator:
         Returns:
             str: ISO 8601 timestamp (e.g., "2025-10-27T13:30:00.123456Z")
         """
-        return datetime.now(timezone.utc).isoformat(timespec="microseconds").replace("+00:00", "Z")
+        return utc_timestamp()
     
     def generate_response(self) -> dict:
         """
-        Generate a complete telemetry response with IMEI, timestamp, and data
+        Generate a complete telemetry response with IMEI, timestamp, and data.
+        The same packet dict is updated in place on every call, so encode (or
+        copy) it before generating the next one.
         
         Returns:
             dict: Complete telemetry packet
@@ -292,16 +374,24 @@ class TelemetryGenerator:
         timestamp = self._get_current_timestamp()
         
         # Generate telemetry data
-        data = self.generate_telemetry_data()
+        data = self._build_data_dict()
         
-        # Build complete packet
-        packet = {
-            "imei": imei,
-            "timestamp": timestamp,
-            "data": data.model_dump()
-        }
+        # Fill the complete packet
+        packet = self._packet_template
+        packet["imei"] = imei
+        packet["timestamp"] = timestamp
+        packet["data"] = data
         
         logger.debug(f"Paquete generado - IMEI: {imei}, TS: {timestamp}")
         
         return packet
+    
+    def generate_responses(self) -> List[dict]:
+        """
+        Generate the packets for one tick (a single vehicle)
+        
+        Returns:
+            list: Telemetry packets, same interface as FleetGenerator
+        """
+        return [self.generate_response()]
 
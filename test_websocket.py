@@ -1,70 +1,283 @@
 """
 Script de prueba para el servicio de telemetría WebSocket
 """
+import argparse
 import asyncio
-import json
-import websockets
+import os
 import sys
+import time
+from queue import SimpleQueue
+from typing import List, Tuple, Union
+import msgspec
+from websockets.asyncio.client import connect as ws_connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+from websockets.extensions.permessage_deflate import ClientPerMessageDeflateFactory
 
+try:
+    # Extensión C de websockets: desenmascara los frames sin recorrer el payload en Python
+    import websockets.speedups  # noqa: F401
+    SPEEDUPS = True
+except ImportError:
+    # Instalación sin wheel compilado: se usa la implementación en Python
+    SPEEDUPS = False
 
-async def test_telemetry_websocket():
+
+# Structs inmutables y fuera del GC: se crean por mensaje, se descartan enseguida
+# y nunca forman ciclos de referencias
+class Data(msgspec.Struct, gc=False, frozen=True):
+    """
+    Campos de telemetría que se muestran. El resto de campos del paquete
+    se omiten al decodificar, sin crear objetos Python para ellos
+    """
+    ignition_status: int
+    movement_status: int
+    speed: int
+    gps_location: str
+    rpm: int
+    engine_temp: int
+    fuel_level: int
+    obd_faults: List[str] = []
+
+
+class Telemetry(msgspec.Struct, gc=False, frozen=True):
+    """Paquete de telemetría completo"""
+    timestamp: str
+    data: Data
+    imei: str = "N/A"
+
+
+# Decodificador precompilado una sola vez y reutilizado en todos los mensajes: un frame
+# trae un paquete o un arreglo de paquetes. Decodifica directo a Structs, sin diccionarios intermedios
+decoder = msgspec.json.Decoder(Union[Telemetry, List[Telemetry]])
+
+# Cantidad de mensajes a recibir por defecto (--count)
+MESSAGE_COUNT = 5
+
+# QUIET=1 (o --quiet) solo cuenta mensajes y paquetes y reporta el throughput, sin imprimirlos
+QUIET = os.environ.get("QUIET") == "1"
+
+# permessage-deflate con ventana completa y contexto compartido entre mensajes:
+# las claves JSON se repiten en cada paquete y se comprimen casi por completo
+COMPRESSION_EXTENSIONS = [
+    ClientPerMessageDeflateFactory(
+        client_max_window_bits=15,
+        server_max_window_bits=15,
+        compress_settings={'memLevel': 7},
+    )
+]
+
+# Buffers amplios para ráfagas de frames y sin pings de keepalive (cliente de prueba de corta duración)
+CONNECT_OPTIONS = {
+    'extensions': COMPRESSION_EXTENSIONS,
+    'max_size': 2 ** 22,
+    'max_queue': 64,
+    'write_limit': 2 ** 20,
+    'ping_interval': None,
+    'ping_timeout': None,
+    'close_timeout': 1,
+}
+
+# Bloque completo de un mensaje: se formatea y escribe de una sola vez
+SEP = "-" * 60 + "\n"
+TPL = (
+    "%s\n🔔 Mensaje #%d recibido:\n"
+    "📱 IMEI: %s\n"
+    "⏰ Timestamp: %s\n"
+    "🚗 Velocidad: %s km/h\n"
+    "🔋 Ignición: %s\n"
+    "🚦 Movimiento: %s\n"
+    "🔧 RPM: %s\n"
+    "🌡️ Temp Motor: %s°C\n"
+    "⛽ Combustible: %s%%\n"
+    "📍 GPS: %s\n"
+    "%s\n"
+) + SEP
+FRAME_HEADER = "\n📦 Frame con %d paquetes\n"
+FAULTS_LINE = "⚠️ Fallas: %s"
+NO_FAULTS_LINE = "✅ Sin fallas OBD"
+
+# Textos de los estados 0/1, indexados por el valor recibido
+IGNITION_TEXT = ("OFF", "ON")
+MOVEMENT_TEXT = ("NO", "SI")
+
+
+def format_message(number: int, telemetry: Union[Telemetry, List[Telemetry]]) -> str:
+    """
+    Construye el texto de un mensaje de telemetría
+    """
+    header = ""
+    if isinstance(telemetry, list):
+        # Frame con varios paquetes acumulados: mostrar el más reciente
+        header = FRAME_HEADER % len(telemetry)
+        telemetry = telemetry[-1]
+    
+    data = telemetry.data
+    faults = data.obd_faults
+    return TPL % (
+        header,
+        number,
+        telemetry.imei,
+        telemetry.timestamp,
+        data.speed,
+        IGNITION_TEXT[data.ignition_status],
+        MOVEMENT_TEXT[data.movement_status],
+        data.rpm,
+        data.engine_temp,
+        data.fuel_level,
+        data.gps_location,
+        FAULTS_LINE % (faults,) if faults else NO_FAULTS_LINE,
+    )
+
+
+async def reader(websocket, queue: SimpleQueue, count: int):
+    """
+    Recibe frames y los encola sin procesarlos. Siempre encola None al
+    terminar para que el hilo consumidor finalice, incluso ante un error
+    """
+    put = queue.put
+    try:
+        received = 0
+        async for data in websocket:
+            put(data)
+            received += 1
+            if received >= count:
+                break
+    finally:
+        queue.put(None)
+
+
+def consumer(queue: SimpleQueue, every: int = 1, quiet: bool = False) -> Tuple[int, int]:
+    """
+    Hilo consumidor: procesa de una vez todos los frames que ya están en cola,
+    los decodifica juntos y escribe su salida con una sola llamada a stdout.
+    Corre fuera del event loop para que la recepción nunca espere al procesamiento
+    
+    Args:
+        queue: Cola de frames sin decodificar, terminada con None
+        every: Imprimir solo uno de cada N mensajes
+        quiet: No imprimir mensajes, solo decodificarlos y contarlos
+    
+    Returns:
+        tuple: Cantidad de mensajes (frames) y de paquetes procesados
+    """
+    received = 0
+    packets = 0
+    # Búsquedas resueltas una sola vez fuera del ciclo
+    get = queue.get
+    get_nowait = queue.get_nowait
+    empty = queue.empty
+    decode = decoder.decode
+    render = format_message
+    join = "".join
+    write = sys.stdout.write
+    flush = sys.stdout.flush
+    while True:
+        batch = [get()]
+        while not empty():
+            batch.append(get_nowait())
+        
+        parsed = [decode(data) for data in batch if data is not None]
+        # Un frame de la flota trae un arreglo con varios paquetes
+        packets += sum(len(telemetry) if isinstance(telemetry, list) else 1 for telemetry in parsed)
+        if quiet:
+            received += len(parsed)
+        else:
+            lines = []
+            for telemetry in parsed:
+                received += 1
+                if received % every == 0:
+                    lines.append(render(received, telemetry))
+            write(join(lines))
+            flush()
+        
+        if batch[-1] is None:
+            return received, packets
+
+
+async def test_telemetry_websocket(count: int = MESSAGE_COUNT, every: int = 1, quiet: bool = QUIET):
     """
     Prueba la conexión al WebSocket de telemetría
+    
+    Args:
+        count: Cantidad de mensajes a recibir
+        every: Imprimir solo uno de cada N mensajes
+        quiet: Solo contar los mensajes y mostrar el throughput al final
     """
     uri = "ws://localhost:8003/ws/telemetria"
     
     print("🔌 Conectando a WebSocket...")
     print(f"📍 URI: {uri}")
-    print("-" * 60)
+    if not SPEEDUPS:
+        print("⚠️ websockets sin extensión C (speedups), el rendimiento será menor")
+    print(SEP, end="")
     
     try:
-        async with websockets.connect(uri) as websocket:
+        async with ws_connect(uri, **CONNECT_OPTIONS) as websocket:
             print("✅ Conectado exitosamente!")
             print("📡 Esperando datos de telemetría...")
-            print("-" * 60)
+            print(SEP, end="", flush=True)
             
-            # Recibir 5 mensajes para la prueba
-            for i in range(5):
-                try:
-                    data = await websocket.recv()
-                    telemetry = json.loads(data)
-                    
-                    print(f"\n🔔 Mensaje #{i + 1} recibido:")
-                    print(f"📱 IMEI: {telemetry.get('imei', 'N/A')}")
-                    print(f"⏰ Timestamp: {telemetry['timestamp']}")
-                    print(f"🚗 Velocidad: {telemetry['data']['speed']} km/h")
-                    print(f"🔋 Ignición: {'ON' if telemetry['data']['ignition_status'] else 'OFF'}")
-                    print(f"🚦 Movimiento: {'SI' if telemetry['data']['movement_status'] else 'NO'}")
-                    print(f"🔧 RPM: {telemetry['data']['rpm']}")
-                    print(f"🌡️ Temp Motor: {telemetry['data']['engine_temp']}°C")
-                    print(f"⛽ Combustible: {telemetry['data']['fuel_level']}%")
-                    print(f"📍 GPS: {telemetry['data']['gps_location']}")
-                    
-                    if telemetry['data']['obd_faults']:
-                        print(f"⚠️ Fallas: {telemetry['data']['obd_faults']}")
-                    else:
-                        print("✅ Sin fallas OBD")
-                    
-                    print("-" * 60)
-                    
-                except Exception as e:
-                    print(f"❌ Error recibiendo mensaje: {str(e)}")
-                    break
+            # Recibir count mensajes para la prueba: el event loop solo recibe y un hilo
+            # decodifica e imprime. Si una tarea falla, el TaskGroup cancela la otra
+            # y propaga el error una sola vez
+            queue = SimpleQueue()
+            start = time.perf_counter()
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(reader(websocket, queue, count))
+                processed = tg.create_task(asyncio.to_thread(consumer, queue, every, quiet))
+            
+            if quiet:
+                elapsed = time.perf_counter() - start
+                messages, packets = processed.result()
+                print(
+                    f"📊 {messages} mensajes / {packets} paquetes en {elapsed:.2f}s "
+                    f"({messages / elapsed:.1f} msg/s, {packets / elapsed:.1f} paquetes/s)"
+                )
             
             print("\n✅ Prueba completada exitosamente!")
             
-    except websockets.exceptions.ConnectionRefused:
+    except* (OSError, InvalidHandshake):
         print("❌ Error: No se pudo conectar al servidor")
         print("💡 Asegúrate de que el servicio esté corriendo con: docker-compose up")
         sys.exit(1)
-    except Exception as e:
-        print(f"❌ Error inesperado: {str(e)}")
+    except* (ConnectionClosed, msgspec.DecodeError) as group:
+        sys.stdout.flush()
+        print(f"❌ Error recibiendo mensaje: {group.exceptions[0]}")
         sys.exit(1)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba del servicio de telemetría WebSocket")
+    parser.add_argument(
+        "--count", type=int, default=MESSAGE_COUNT, metavar="N",
+        help=f"cantidad de mensajes a recibir (por defecto {MESSAGE_COUNT})"
+    )
+    parser.add_argument(
+        "--every", type=int, default=1, metavar="N",
+        help="imprimir solo uno de cada N mensajes"
+    )
+    parser.add_argument(
+        "--quiet", action="store_true", default=QUIET,
+        help="no imprimir mensajes, solo reportar el throughput (por defecto desde QUIET=1)"
+    )
+    args = parser.parse_args()
+    if args.count < 1:
+        parser.error("--count debe ser mayor que 0")
+    if args.every < 1:
+        parser.error("--every debe ser mayor que 0")
+    
+    # Sin vaciado por línea: cada lote de mensajes se vacía una sola vez
+    sys.stdout.reconfigure(line_buffering=False, write_through=False)
     print("=" * 60)
     print("🧪 PRUEBA DEL SERVICIO DE TELEMETRÍA")
     print("=" * 60)
-    asyncio.run(test_telemetry_websocket())
+    
+    try:
+        # uvloop (libuv) reduce el costo de cada await y de la lectura del socket
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        # Fallback al event loop por defecto (uvloop no está disponible en Windows)
+        pass
+    asyncio.run(test_telemetry_websocket(count=args.count, every=args.every, quiet=args.quiet))
 